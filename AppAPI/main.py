@@ -1,16 +1,25 @@
 import os
-import json
+import orjson
+import hashlib
 import requests
 import logging
-from typing import List, Dict, Any, Optional
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import IO, List, Dict, Any, Optional
 from fastapi import FastAPI, File, Form, UploadFile, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
+from fastapi.openapi.utils import get_openapi
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
+import msgspec
+import numpy as np
 import google.generativeai as genai
 from dotenv import load_dotenv
 import aiohttp
 import asyncio
+import ahocorasick
+import redis.asyncio as redis
+import simdjson
 
 # Load environment variables
 load_dotenv()
@@ -24,6 +33,7 @@ app = FastAPI(
     title="Nutrition Analysis API",
     description="API for analyzing food images and providing nutritional information",
     version="1.0.0",
+    default_response_class=ORJSONResponse,
 )
 
 # Configure CORS for Flutter app
@@ -38,13 +48,191 @@ app.add_middleware(
 # Configure Gemini API
 genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
 gemini_model = genai.GenerativeModel("gemini-2.0-flash-exp")
+GEMINI_CONCURRENCY = int(os.getenv("GEMINI_CONCURRENCY", "8"))
 
 # USDA API configuration
 USDA_API_KEY = os.getenv("USDA_API_KEY")
 USDA_BASE_URL = "https://api.nal.usda.gov/fdc/v1"
+USDA_CONCURRENCY = int(os.getenv("USDA_CONCURRENCY", "10"))
+USDA_MAX_ATTEMPTS = 3
+USDA_MAX_RETRY_DELAY = 10.0  # seconds
+WARMUP_TIMEOUT = 10.0  # seconds
+
+# Redis configuration (cache for USDA lookups)
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+USDA_CACHE_TTL = 86400 * 7  # 7 days
+USDA_MISS_CACHE_TTL = 3600  # 1 hour for foods not found in USDA
+REDIS_TIMEOUT = 0.5  # seconds; a slow cache is treated as a miss
+GEMINI_CACHE_TTL = 86400 * 30  # 30 days
+
+# Uploads are read in chunks of this size while hashing
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# USDA nutrient IDs, in NutritionInfo field order
+NUTRIENT_IDS = np.array(
+    [
+        1008,  # Energy
+        1003,  # Protein
+        1005,  # Carbohydrate
+        1004,  # Total lipid (fat)
+        1079,  # Fiber
+        2000,  # Sugars
+        1093,  # Sodium
+        1253,  # Cholesterol
+    ],
+    dtype=np.int32,
+)
+NUTRIENT_ATTRS = (
+    "calories",
+    "protein",
+    "carbs",
+    "fat",
+    "fiber",
+    "sugar",
+    "sodium",
+    "cholesterol",
+)
+# Sorted view of NUTRIENT_IDS for searchsorted lookups
+NUTRIENT_ORDER = np.argsort(NUTRIENT_IDS)
+NUTRIENT_IDS_SORTED = NUTRIENT_IDS[NUTRIENT_ORDER]
+
+# Common food words to look for in free-text Gemini responses
+COMMON_FOODS = frozenset(
+    {
+        "apple",
+        "banana",
+        "orange",
+        "rice",
+        "chicken",
+        "beef",
+        "pork",
+        "fish",
+        "bread",
+        "pasta",
+        "salad",
+        "vegetables",
+        "fruits",
+        "eggs",
+        "cheese",
+        "yogurt",
+        "milk",
+        "potato",
+        "tomato",
+        "carrot",
+        "broccoli",
+        "spinach",
+    }
+)
+
+# Stop words skipped when guessing food names from free text
+STOP_WORDS = frozenset(
+    {
+        "the",
+        "and",
+        "or",
+        "but",
+        "in",
+        "on",
+        "at",
+        "to",
+        "for",
+        "of",
+        "with",
+        "by",
+        "a",
+        "an",
+    }
+)
+
+# Automaton matching all common foods in a single pass over the text
+FOOD_AUTOMATON = ahocorasick.Automaton()
+for _food in COMMON_FOODS:
+    FOOD_AUTOMATON.add_word(_food, _food)
+FOOD_AUTOMATON.make_automaton()
+
+# Shared HTTP session, created on startup so connections to USDA are reused
+app.state.http: Optional[aiohttp.ClientSession] = None
+app.state.redis: Optional[redis.Redis] = None
+app.state.usda_semaphore: Optional[asyncio.Semaphore] = None
+# Blocking Gemini SDK calls run here so they can't starve the default threadpool
+app.state.gemini_pool: Optional[ThreadPoolExecutor] = None
+
 
+@dataclass
+class ConnectionMetrics:
+    requests: int = 0
+    successes: int = 0
+    failures: int = 0
+    retries: int = 0
 
-class NutritionInfo(BaseModel):
+
+usda_metrics = ConnectionMetrics()
+
+
+class USDALookupError(Exception):
+    """USDA could not be queried (as opposed to returning no match)"""
+
+
+# Reused for USDA responses; only the parts we read become Python objects
+usda_parser = simdjson.Parser()
+
+
+async def warm_up_usda() -> None:
+    """Resolve DNS and open a TLS connection to USDA ahead of the first request"""
+    try:
+        async with app.state.http.head(
+            USDA_BASE_URL, timeout=aiohttp.ClientTimeout(total=2)
+        ):
+            pass
+    except Exception as e:
+        logger.warning(f"USDA warm-up failed: {str(e)}")
+
+
+async def warm_up_gemini() -> None:
+    """Initialize the Gemini client ahead of the first request"""
+    try:
+        await asyncio.wait_for(
+            run_in_gemini_pool(gemini_model.generate_content, ["ping"]),
+            timeout=WARMUP_TIMEOUT,
+        )
+    except Exception as e:
+        logger.warning(f"Gemini warm-up failed: {str(e)}")
+
+
+@app.on_event("startup")
+async def startup_event():
+    """Create the shared clients and warm up connections to USDA and Gemini"""
+    app.state.http = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(
+            limit=100, limit_per_host=30, ttl_dns_cache=300, keepalive_timeout=60
+        ),
+        timeout=aiohttp.ClientTimeout(total=10),
+    )
+    app.state.redis = redis.from_url(
+        REDIS_URL, socket_connect_timeout=REDIS_TIMEOUT, socket_timeout=REDIS_TIMEOUT
+    )
+    app.state.usda_semaphore = asyncio.Semaphore(USDA_CONCURRENCY)
+    app.state.gemini_pool = ThreadPoolExecutor(
+        max_workers=GEMINI_CONCURRENCY, thread_name_prefix="gemini"
+    )
+    await asyncio.gather(warm_up_usda(), warm_up_gemini())
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Close the shared HTTP session, Redis client and Gemini threadpool"""
+    if app.state.http is not None:
+        await app.state.http.close()
+        app.state.http = None
+    if app.state.redis is not None:
+        await app.state.redis.aclose()
+        app.state.redis = None
+    if app.state.gemini_pool is not None:
+        app.state.gemini_pool.shutdown(wait=False)
+        app.state.gemini_pool = None
+
+
+class NutritionInfo(msgspec.Struct):
     calories: float = 0.0
     protein: float = 0.0
     carbs: float = 0.0
@@ -55,27 +243,99 @@ class NutritionInfo(BaseModel):
     cholesterol: float = 0.0
 
 
-class FoodItem(BaseModel):
+class FoodItem(msgspec.Struct):
     name: str
     nutrition: NutritionInfo
 
 
-class NutritionResponse(BaseModel):
+class NutritionResponse(msgspec.Struct):
     success: bool
     foods_detected: List[FoodItem]
     total_nutrition: NutritionInfo
 
 
-async def detect_foods_with_gemini(image_bytes: bytes) -> List[str]:
+# OpenAPI schema for the msgspec response models (FastAPI only documents pydantic)
+(NUTRITION_RESPONSE_SCHEMA,), NUTRITION_SCHEMA_COMPONENTS = (
+    msgspec.json.schema_components(
+        [NutritionResponse], ref_template="#/components/schemas/{name}"
+    )
+)
+
+
+def custom_openapi() -> Dict[str, Any]:
+    """Build the OpenAPI schema, including the msgspec model components"""
+    if app.openapi_schema:
+        return app.openapi_schema
+    openapi_schema = get_openapi(
+        title=app.title,
+        version=app.version,
+        description=app.description,
+        routes=app.routes,
+    )
+    openapi_schema.setdefault("components", {}).setdefault("schemas", {}).update(
+        NUTRITION_SCHEMA_COMPONENTS
+    )
+    app.openapi_schema = openapi_schema
+    return app.openapi_schema
+
+
+app.openapi = custom_openapi
+
+# Shared encoder for the /analyze-food response body
+JSON_ENCODER = msgspec.json.Encoder()
+
+
+def encode_response(content: Any) -> Response:
+    """Encode a response body with the shared msgspec encoder"""
+    return Response(content=JSON_ENCODER.encode(content), media_type="application/json")
+
+
+def run_in_gemini_pool(func, *args, **kwargs) -> asyncio.Future:
+    """Run a blocking Gemini SDK call on the dedicated Gemini threadpool"""
+    loop = asyncio.get_running_loop()
+    return loop.run_in_executor(
+        app.state.gemini_pool, functools.partial(func, *args, **kwargs)
+    )
+
+
+def generate_food_content(prompt: str, image_file: IO[bytes], mime_type: str) -> Any:
+    """Send the prompt with the image inline to Gemini (runs on the Gemini pool)"""
+    # The spooled upload is only read into memory here, off the event loop
+    image_part = {"mime_type": mime_type, "data": image_file.read()}
+    return gemini_model.generate_content([prompt, image_part])
+
+
+def parse_gemini_json(response_text: str) -> Any:
+    """Parse JSON from a Gemini response, tolerating text around it"""
+    try:
+        # Fast path: the whole response is JSON
+        return orjson.loads(response_text)
+    except orjson.JSONDecodeError:
+        # Look for JSON pattern in response (e.g. wrapped in a code fence)
+        json_start = response_text.find("{")
+        json_end = response_text.rfind("}") + 1
+        if json_start != -1 and json_end > json_start:
+            return orjson.loads(response_text[json_start:json_end])
+        raise
+
+
+async def detect_foods_with_gemini(
+    image_file: IO[bytes], image_hash: str, mime_type: str
+) -> List[str]:
     """Use Gemini API to detect foods in the image"""
     try:
-        # Upload image to Gemini
-        image_part = {"mime_type": "image/jpeg", "data": image_bytes}
+        # Return cached detections for an identical image
+        key = f"gemini:{image_hash}"
+        cached = await cache_get(key)
+        if cached is not None:
+            foods = orjson.loads(cached)
+            logger.info(f"Foods detected (cached): {foods}")
+            return foods
 
         prompt = 'Identify food and ingredients present in the image and give the names of each back in a JSON format like: {"foods": ["apple", "banana", "rice"]}. Only return the JSON, no additional text.'
 
-        response = await asyncio.to_thread(
-            gemini_model.generate_content, [prompt, image_part]
+        response = await run_in_gemini_pool(
+            generate_food_content, prompt, image_file, mime_type
         )
 
         # Parse the response
@@ -84,25 +344,23 @@ async def detect_foods_with_gemini(image_bytes: bytes) -> List[str]:
 
         # Try to extract JSON from response
         try:
-            # Look for JSON pattern in response
-            json_start = response_text.find("{")
-            json_end = response_text.rfind("}") + 1
-            if json_start != -1 and json_end > json_start:
-                json_str = response_text[json_start:json_end]
-                food_data = json.loads(json_str)
-                foods = food_data.get("foods", [])
-            else:
-                # Fallback: try to parse entire response as JSON
-                food_data = json.loads(response_text)
-                foods = food_data.get("foods", [])
-        except json.JSONDecodeError:
+            food_data = parse_gemini_json(response_text)
+            foods = food_data.get("foods", [])
+            parsed = isinstance(foods, list) and all(
+                isinstance(food, str) for food in foods
+            )
+        except orjson.JSONDecodeError:
             # If JSON parsing fails, try to extract food names from text
             logger.warning(
                 "Failed to parse JSON from Gemini response, using fallback method"
             )
             foods = extract_food_names_from_text(response_text)
+            parsed = False
 
         logger.info(f"Foods detected: {foods}")
+        # Only cache well-formed answers, never the text-extraction fallback
+        if parsed:
+            await cache_set(key, GEMINI_CACHE_TTL, orjson.dumps(foods))
         return foods
 
     except Exception as e:
@@ -112,68 +370,38 @@ async def detect_foods_with_gemini(image_bytes: bytes) -> List[str]:
 
 def extract_food_names_from_text(text: str) -> List[str]:
     """Fallback method to extract food names from text"""
-    # Common food words to look for
-    common_foods = [
-        "apple",
-        "banana",
-        "orange",
-        "rice",
-        "chicken",
-        "beef",
-        "pork",
-        "fish",
-        "bread",
-        "pasta",
-        "salad",
-        "vegetables",
-        "fruits",
-        "eggs",
-        "cheese",
-        "yogurt",
-        "milk",
-        "potato",
-        "tomato",
-        "carrot",
-        "broccoli",
-        "spinach",
-    ]
-
     text_lower = text.lower()
-    detected_foods = []
-
-    for food in common_foods:
-        if food in text_lower:
-            detected_foods.append(food)
+    detected_foods = list(
+        dict.fromkeys(food for _, food in FOOD_AUTOMATON.iter(text_lower))
+    )
 
     # If no common foods found, try to extract words that might be food names
     if not detected_foods:
         words = text_lower.split()
         # Simple heuristic: words that are not too short and not common stop words
-        stop_words = {
-            "the",
-            "and",
-            "or",
-            "but",
-            "in",
-            "on",
-            "at",
-            "to",
-            "for",
-            "of",
-            "with",
-            "by",
-            "a",
-            "an",
-        }
         detected_foods = [
-            word for word in words if len(word) > 3 and word not in stop_words
+            word for word in words if len(word) > 3 and word not in STOP_WORDS
         ][:5]
 
     return detected_foods if detected_foods else ["food"]
 
 
+def get_retry_delay(response: aiohttp.ClientResponse, attempt: int) -> float:
+    """Seconds to wait before retrying, honouring the Retry-After header"""
+    retry_after = response.headers.get("Retry-After")
+    try:
+        delay = float(retry_after) if retry_after else 2 ** (attempt - 1)
+    except ValueError:
+        delay = 2 ** (attempt - 1)
+    return min(max(delay, 0.0), USDA_MAX_RETRY_DELAY)
+
+
 async def search_food_in_usda(food_name: str) -> Optional[Dict[str, Any]]:
-    """Search for food in USDA FoodData Central API"""
+    """Search for food in USDA FoodData Central API
+
+    Returns None when USDA has no match and raises USDALookupError when the
+    request itself fails.
+    """
     try:
         url = f"{USDA_BASE_URL}/foods/search"
         params = {
@@ -185,60 +413,132 @@ async def search_food_in_usda(food_name: str) -> Optional[Dict[str, Any]]:
             "sortOrder": "desc",
         }
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    foods = data.get("foods", [])
-                    if foods:
-                        return foods[0]  # Return the first match
-                else:
-                    logger.error(
-                        f"USDA API error: {response.status} - {await response.text()}"
-                    )
-
+        session = app.state.http
+        # Limit concurrent USDA requests and retry on rate limiting / server errors
+        async with app.state.usda_semaphore:
+            for attempt in range(1, USDA_MAX_ATTEMPTS + 1):
+                usda_metrics.requests += 1
+                async with session.get(url, params=params) as response:
+                    if response.status == 200:
+                        raw = await response.read()
+                        doc = usda_parser.parse(raw)
+                        foods = doc.get("foods", [])
+                        food = foods[0].as_dict() if len(foods) else None
+                        usda_metrics.successes += 1
+                        return food  # The first match, if any
+
+                    retryable = response.status == 429 or response.status >= 500
+                    if not retryable or attempt == USDA_MAX_ATTEMPTS:
+                        usda_metrics.failures += 1
+                        logger.error(
+                            f"USDA API error: {response.status} - {await response.text()}"
+                        )
+                        raise USDALookupError(f"USDA API error: {response.status}")
+
+                    delay = get_retry_delay(response, attempt)
+
+                usda_metrics.retries += 1
+                logger.warning(
+                    f"USDA API returned {response.status} for {food_name}, "
+                    f"retrying in {delay:.1f}s (attempt {attempt}/{USDA_MAX_ATTEMPTS})"
+                )
+                await asyncio.sleep(delay)
+
+    except USDALookupError:
+        raise
     except Exception as e:
+        usda_metrics.failures += 1
         logger.error(f"Error searching USDA database for {food_name}: {str(e)}")
-
-    return None
+        raise USDALookupError(str(e)) from e
 
 
 def extract_nutrition_info(food_data: Dict[str, Any]) -> NutritionInfo:
     """Extract nutrition information from USDA food data"""
-    nutrition = NutritionInfo()
-
     # Get food nutrients
     nutrients = food_data.get("foodNutrients", [])
 
-    # Map nutrient IDs to their names (common USDA nutrient IDs)
-    nutrient_mapping = {
-        1008: "calories",  # Energy
-        1003: "protein",  # Protein
-        1005: "carbs",  # Carbohydrate
-        1004: "fat",  # Total lipid (fat)
-        1079: "fiber",  # Fiber
-        2000: "sugar",  # Sugars
-        1093: "sodium",  # Sodium
-        1253: "cholesterol",  # Cholesterol
-    }
+    ids = np.fromiter(
+        (n.get("nutrientId") or 0 for n in nutrients),
+        dtype=np.int32,
+        count=len(nutrients),
+    )
+    vals = np.fromiter(
+        (n.get("value") or 0.0 for n in nutrients),
+        dtype=np.float64,
+        count=len(nutrients),
+    )
 
-    for nutrient in nutrients:
-        nutrient_id = nutrient.get("nutrientId")
-        amount = nutrient.get("value", 0)
+    # Map the nutrients we track to their NutritionInfo field position
+    mask = np.isin(ids, NUTRIENT_IDS)
+    positions = NUTRIENT_ORDER[np.searchsorted(NUTRIENT_IDS_SORTED, ids[mask])]
 
-        if nutrient_id in nutrient_mapping:
-            nutrient_name = nutrient_mapping[nutrient_id]
-            if hasattr(nutrition, nutrient_name):
-                setattr(nutrition, nutrient_name, amount)
+    values = np.zeros(len(NUTRIENT_IDS), dtype=np.float64)
+    values[positions] = vals[mask]
 
-    return nutrition
+    return NutritionInfo(*values.tolist())
 
 
-async def get_nutritional_info(food_name: str) -> Optional[FoodItem]:
-    """Get complete nutritional information for a food item"""
+async def cache_get(key: str) -> Optional[bytes]:
+    """Read a value from Redis, ignoring cache errors"""
+    if app.state.redis is None:
+        return None
     try:
-        # Search in USDA database
-        food_data = await search_food_in_usda(food_name)
+        return await app.state.redis.get(key)
+    except Exception as e:
+        logger.warning(f"Redis GET failed for {key}: {str(e)}")
+        return None
+
+
+async def cache_get_many(keys: List[str]) -> List[Optional[bytes]]:
+    """Read several values from Redis in one round trip, ignoring cache errors"""
+    if app.state.redis is None or not keys:
+        return [None] * len(keys)
+    try:
+        return await app.state.redis.mget(keys)
+    except Exception as e:
+        logger.warning(f"Redis MGET failed for {keys}: {str(e)}")
+        return [None] * len(keys)
+
+
+async def cache_set(key: str, ttl: int, value: bytes) -> None:
+    """Write a value to Redis, ignoring cache errors"""
+    if app.state.redis is None:
+        return
+    try:
+        await app.state.redis.setex(key, ttl, value)
+    except Exception as e:
+        logger.warning(f"Redis SETEX failed for {key}: {str(e)}")
+
+
+def normalize_food_name(food_name: str) -> str:
+    """Normalize a detected food name for deduplication and caching"""
+    return food_name.lower().strip()
+
+
+def usda_cache_key(food_name: str) -> str:
+    """Redis key for a food's USDA lookup"""
+    return f"usda:{normalize_food_name(food_name)}"
+
+
+async def get_nutritional_info(
+    food_name: str, cached: Optional[bytes] = None
+) -> Optional[FoodItem]:
+    """Get complete nutritional information for a food item
+
+    ``cached`` is the food's cached USDA lookup, if one was found.
+    """
+    try:
+        key = usda_cache_key(food_name)
+
+        if cached is not None:
+            food_data = orjson.loads(cached)
+        else:
+            # Search in USDA database
+            food_data = await search_food_in_usda(food_name)
+            # Cache "no match" answers too, with a shorter TTL, so USDA isn't
+            # queried again; failed lookups raise and are never cached
+            ttl = USDA_CACHE_TTL if food_data else USDA_MISS_CACHE_TTL
+            await cache_set(key, ttl, orjson.dumps(food_data))
 
         if food_data:
             nutrition = extract_nutrition_info(food_data)
@@ -253,13 +553,37 @@ async def get_nutritional_info(food_name: str) -> Optional[FoodItem]:
         return FoodItem(name=food_name, nutrition=NutritionInfo())
 
 
+async def get_nutritional_info_batch(food_names: List[str]) -> List[Any]:
+    """Get nutritional information for several food items
+
+    Cached lookups are read in a single round trip and the remaining foods
+    are queried in USDA concurrently. Results may include exceptions.
+    """
+    cached = await cache_get_many([usda_cache_key(name) for name in food_names])
+    return await asyncio.gather(
+        *[
+            get_nutritional_info(food_name, cached_value)
+            for food_name, cached_value in zip(food_names, cached)
+        ],
+        return_exceptions=True,
+    )
+
+
 @app.get("/")
 async def root():
     """Root endpoint"""
     return {"message": "Nutrition Analysis API is running", "version": "1.0.0"}
 
 
-@app.post("/analyze-food", response_model=NutritionResponse)
+@app.post(
+    "/analyze-food",
+    responses={
+        200: {
+            "description": "Detected foods and their nutritional information",
+            "content": {"application/json": {"schema": NUTRITION_RESPONSE_SCHEMA}},
+        }
+    },
+)
 async def analyze_food_image(file: UploadFile = File(...)):
     """
     Analyze a food image and return nutritional information.
@@ -272,53 +596,71 @@ async def analyze_food_image(file: UploadFile = File(...)):
         if not file.content_type or not file.content_type.startswith("image/"):
             raise HTTPException(status_code=400, detail="File must be an image")
 
-        # Read image bytes
-        image_bytes = await file.read()
+        # Hash the image in chunks instead of loading it into memory;
+        # the upload itself is already spooled to a temporary file
+        image_hasher = hashlib.blake2b(digest_size=16)
+        image_size = 0
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            image_hasher.update(chunk)
+            image_size += len(chunk)
 
-        if len(image_bytes) == 0:
+        if image_size == 0:
             raise HTTPException(status_code=400, detail="Empty image file")
 
-        logger.info(f"Received image: {file.filename}, size: {len(image_bytes)} bytes")
+        logger.info(f"Received image: {file.filename}, size: {image_size} bytes")
+        await file.seek(0)
 
         # Step 1: Detect foods using Gemini
-        detected_foods = await detect_foods_with_gemini(image_bytes)
+        detected_foods = await detect_foods_with_gemini(
+            file.file, image_hasher.hexdigest(), file.content_type
+        )
 
         if not detected_foods:
-            return NutritionResponse(
-                success=True, foods_detected=[], total_nutrition=NutritionInfo()
+            return encode_response(
+                {
+                    "success": True,
+                    "foods_detected": [],
+                    "total_nutrition": dict.fromkeys(NUTRIENT_ATTRS, 0.0),
+                }
             )
 
         # Step 2: Get nutritional information for each food
         food_items = []
-        total_nutrition = NutritionInfo()
+        nutrition_rows = []
+
+        # Look up each distinct food once, as one cache/USDA batch
+        unique_foods = list(dict.fromkeys(map(normalize_food_name, detected_foods)))
+        results = await get_nutritional_info_batch(unique_foods)
+        nutrition_by_food = {}
+        for food_name, food_item in zip(unique_foods, results):
+            if isinstance(food_item, BaseException):
+                logger.error(f"Error getting nutritional info: {str(food_item)}")
+                continue
+            if food_item:
+                nutrition_by_food[food_name] = food_item.nutrition
 
+        # One entry per detection, keeping the names as Gemini returned them
         for food_name in detected_foods:
-            food_item = await get_nutritional_info(food_name)
-            if food_item:
-                food_items.append(food_item)
-
-                # Add to totals
-                total_nutrition.calories += food_item.nutrition.calories
-                total_nutrition.protein += food_item.nutrition.protein
-                total_nutrition.carbs += food_item.nutrition.carbs
-                total_nutrition.fat += food_item.nutrition.fat
-                total_nutrition.fiber += food_item.nutrition.fiber
-                total_nutrition.sugar += food_item.nutrition.sugar
-                total_nutrition.sodium += food_item.nutrition.sodium
-                total_nutrition.cholesterol += food_item.nutrition.cholesterol
-
-        # Round totals to 2 decimal places
-        total_nutrition.calories = round(total_nutrition.calories, 2)
-        total_nutrition.protein = round(total_nutrition.protein, 2)
-        total_nutrition.carbs = round(total_nutrition.carbs, 2)
-        total_nutrition.fat = round(total_nutrition.fat, 2)
-        total_nutrition.fiber = round(total_nutrition.fiber, 2)
-        total_nutrition.sugar = round(total_nutrition.sugar, 2)
-        total_nutrition.sodium = round(total_nutrition.sodium, 2)
-        total_nutrition.cholesterol = round(total_nutrition.cholesterol, 2)
-
-        return NutritionResponse(
-            success=True, foods_detected=food_items, total_nutrition=total_nutrition
+            nutrition = nutrition_by_food.get(normalize_food_name(food_name))
+            if nutrition is not None:
+                food_items.append(FoodItem(name=food_name, nutrition=nutrition))
+                nutrition_rows.append(msgspec.structs.astuple(nutrition))
+
+        # Add up totals across all foods, rounded to 2 decimal places
+        totals = np.round(
+            np.array(nutrition_rows, dtype=np.float64)
+            .reshape(-1, len(NUTRIENT_ATTRS))
+            .sum(axis=0),
+            2,
+        )
+        total_nutrition = dict(zip(NUTRIENT_ATTRS, totals.tolist()))
+
+        return encode_response(
+            {
+                "success": True,
+                "foods_detected": food_items,
+                "total_nutrition": total_nutrition,
+            }
         )
 
     except HTTPException:
@@ -331,7 +673,11 @@ async def analyze_food_image(file: UploadFile = File(...)):
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "service": "nutrition-analysis-api"}
+    return {
+        "status": "healthy",
+        "service": "nutrition-analysis-api",
+        "usda": asdict(usda_metrics),
+    }
 
 
 if __name__ == "__main__":
@@ -346,4 +692,5 @@ if __name__ == "__main__":
         logger.error("USDA_API_KEY not found in environment variables")
         exit(1)
 
-    uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
+    # uvicorn picks uvloop and httptools automatically where they are installed
+    uvicorn.run(app, host="0.0.0.0", port=8000)